@@ -1,8 +1,111 @@
 import requests
-import json
-from typing import Dict, Any, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.util.retry import Retry
+import orjson
+import socket
+import time
+from urllib.parse import urlsplit
+from types import MappingProxyType
+from typing import Dict, Any, Iterator, Mapping, Optional, Tuple
 from config_manager import ConfigManager
 
+# 每个主机保持的最大长连接数，主程序的并发批次数不会超过该值
+POOL_MAXSIZE = 32
+
+# 用于验证API密钥的模型列表接口，只做鉴权，不消耗token
+_VALIDATE_URLS: Mapping[str, str] = MappingProxyType({
+    "deepseek": "https://api.deepseek.com/v1/models",
+    "qwen": "https://dashscope.aliyuncs.com/compatible-mode/v1/models"
+})
+
+# 各模型服务的接口地址前缀
+API_HOSTS = ("https://api.deepseek.com", "https://dashscope.aliyuncs.com")
+
+# 模型服务域名DNS解析结果的缓存时间（秒）
+DNS_CACHE_TTL = 300
+
+_DNS_CACHED_HOSTS = frozenset(urlsplit(prefix).hostname for prefix in API_HOSTS)
+_dns_cache: Dict[Tuple[Any, ...], Tuple[float, Any]] = {}
+# 模块被重新加载时取回最初的解析函数，避免缓存层层嵌套
+_original_getaddrinfo = getattr(socket.getaddrinfo, "__wrapped__", socket.getaddrinfo)
+
+def _cached_getaddrinfo(host, port, *args, **kwargs):
+    """缓存模型服务域名的DNS解析结果，空闲断线后重连时免去一次DNS查询；其他域名照常解析"""
+    if host not in _DNS_CACHED_HOSTS:
+        return _original_getaddrinfo(host, port, *args, **kwargs)
+    
+    key = (host, port, args, tuple(sorted(kwargs.items())))
+    now = time.monotonic()
+    cached = _dns_cache.get(key)
+    if cached and cached[0] > now:
+        return cached[1]
+    
+    result = _original_getaddrinfo(host, port, *args, **kwargs)
+    _dns_cache[key] = (now + DNS_CACHE_TTL, result)
+    return result
+
+_cached_getaddrinfo.__wrapped__ = _original_getaddrinfo
+socket.getaddrinfo = _cached_getaddrinfo
+
+# 支持的模型配置，导入时构建一次，所有APICaller实例共享且只读
+_MODELS: Mapping[str, Mapping[str, Any]] = MappingProxyType({
+    "deepseek": {
+        "name": "DeepSeek",
+        "models": {
+            "deepseek-chat": {
+                "name": "DeepSeek Chat",
+                "url": "https://api.deepseek.com/v1/chat/completions",
+                "max_tokens": 4000,
+                "description": "适用于一般对话和简单试题转换"
+            },
+            "deepseek-coder": {
+                "name": "DeepSeek Coder",
+                "url": "https://api.deepseek.com/v1/chat/completions",
+                "max_tokens": 4000,
+                "description": "专注于代码相关的试题转换"
+            }
+        }
+    },
+    "qwen": {
+        "name": "Qwen",
+        "models": {
+            "qwen-turbo": {
+                "name": "Qwen Turbo",
+                "url": "https://dashscope.aliyuncs.com/api/v1/services/aigc/text-generation/generation",
+                "max_tokens": 2000,
+                "description": "快速响应，适合简单试题"
+            },
+            "qwen-plus": {
+                "name": "Qwen Plus",
+                "url": "https://dashscope.aliyuncs.com/api/v1/services/aigc/text-generation/generation",
+                "max_tokens": 4000,
+                "description": "平衡速度和质量，适合一般试题"
+            },
+            "qwen-max": {
+                "name": "Qwen Max",
+                "url": "https://dashscope.aliyuncs.com/api/v1/services/aigc/text-generation/generation",
+                "max_tokens": 6000,
+                "description": "最高质量，适合复杂试题"
+            }
+        }
+    }
+})
+
+# 各模型类型未指定模型时使用的默认模型
+DEFAULT_MODELS: Mapping[str, str] = MappingProxyType({
+    "deepseek": "deepseek-chat",
+    "qwen": "qwen-turbo"
+})
+
+# 扁平化的(模型类型, 模型) -> 模型配置查找表，调用时只需一次哈希查找
+_FLAT: Mapping[Tuple[str, str], Dict[str, Any]] = MappingProxyType({
+    (provider, m): {**meta, "provider": provider, "model": m}
+    for provider, p in _MODELS.items()
+    for m, meta in p["models"].items()
+})
+_PROVIDERS = frozenset(_MODELS)
+
 class APIError(Exception):
     """API调用错误"""
     pass
@@ -15,90 +118,104 @@ class APIKeyError(Exception):
     """API密钥错误"""
     pass
 
+class _TunedHTTPAdapter(HTTPAdapter):
+    """调整了套接字选项的连接池适配器"""
+    
+    # 在urllib3默认的TCP_NODELAY（关闭Nagle合包，小请求立即发出）基础上，
+    # 开启TCP保活，及早发现被中间设备静默断开的空闲长连接
+    socket_options = HTTPConnection.default_socket_options + [
+        (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    ]
+    
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["socket_options"] = self.socket_options
+        super().init_poolmanager(*args, **kwargs)
+
 class APICaller:
     """API调用类"""
     
     def __init__(self):
         """初始化API调用器"""
         self.config = ConfigManager()
-        self.models = {
-            "deepseek": {
-                "name": "DeepSeek",
-                "models": {
-                    "deepseek-chat": {
-                        "name": "DeepSeek Chat",
-                        "url": "https://api.deepseek.com/v1/chat/completions",
-                        "max_tokens": 4000,
-                        "description": "适用于一般对话和简单试题转换"
-                    },
-                    "deepseek-coder": {
-                        "name": "DeepSeek Coder",
-                        "url": "https://api.deepseek.com/v1/chat/completions",
-                        "max_tokens": 4000,
-                        "description": "专注于代码相关的试题转换"
-                    }
-                }
-            },
-            "qwen": {
-                "name": "Qwen",
-                "models": {
-                    "qwen-turbo": {
-                        "name": "Qwen Turbo",
-                        "url": "https://dashscope.aliyuncs.com/api/v1/services/aigc/text-generation/generation",
-                        "max_tokens": 2000,
-                        "description": "快速响应，适合简单试题"
-                    },
-                    "qwen-plus": {
-                        "name": "Qwen Plus",
-                        "url": "https://dashscope.aliyuncs.com/api/v1/services/aigc/text-generation/generation",
-                        "max_tokens": 4000,
-                        "description": "平衡速度和质量，适合一般试题"
-                    },
-                    "qwen-max": {
-                        "name": "Qwen Max",
-                        "url": "https://dashscope.aliyuncs.com/api/v1/services/aigc/text-generation/generation",
-                        "max_tokens": 6000,
-                        "description": "最高质量，适合复杂试题"
-                    }
-                }
-            }
-        }
+        self._session = self._create_session()
+        self.models = _MODELS
+        self._flat = _FLAT
+        self._providers = _PROVIDERS
+        self._dispatch = {"deepseek": self._stream_deepseek, "qwen": self._stream_qwen}
+    
+    def _create_session(self) -> requests.Session:
+        """创建复用连接的HTTP会话"""
+        session = requests.Session()
+        # 限流和服务端临时错误自动指数退避重试（遵循Retry-After），
+        # 重试复用已建立的长连接；最终响应仍交给状态码分支处理
+        # 请求体发出后读取超时或连接中断时不重试，避免重复提交计费的生成请求；
+        # 只重试连接失败和429/5xx状态码
+        retry = Retry(
+            total=3,
+            read=0,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=frozenset(["POST"]),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = _TunedHTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=POOL_MAXSIZE,
+            pool_block=False,
+            max_retries=retry
+        )
+        for prefix in API_HOSTS:
+            session.mount(prefix, adapter)
+        session.headers.update({"Content-Type": "application/json"})
+        return session
     
-    def _call_deepseek(self, api_key: str, prompt: str, model: str = "deepseek-chat") -> str:
-        """调用DeepSeek API"""
+    def close(self) -> None:
+        """关闭HTTP会话，释放连接池"""
+        self._session.close()
+    
+    def _iter_sse_data(self, response: requests.Response) -> Iterator[Dict[str, Any]]:
+        """逐条解析SSE响应中的data事件"""
+        for line in response.iter_lines():
+            if not line.startswith(b"data:"):
+                continue
+            payload = line[5:].strip()
+            if payload == b"[DONE]":
+                break
+            yield orjson.loads(payload)
+    
+    def _stream_deepseek(self, api_key: str, prompt: str, cfg: Dict[str, Any], max_tokens: Optional[int] = None) -> Iterator[str]:
+        """流式调用DeepSeek API，逐段返回生成内容"""
         try:
-            if model not in self.models["deepseek"]["models"]:
-                raise ModelNotSupportedError(f"不支持的DeepSeek模型: {model}")
-            
-            headers = {
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json"
-            }
+            headers = {"Authorization": f"Bearer {api_key}"}
             
             data = {
-                "model": model,
+                "model": cfg["model"],
                 "messages": [
                     {"role": "system", "content": "你是一个专业的试题转换助手，请严格按照要求转换试题格式。"},
                     {"role": "user", "content": prompt}
                 ],
                 "temperature": 0.3,  # 降低随机性
-                "max_tokens": self.models["deepseek"]["models"][model]["max_tokens"]
+                "max_tokens": max_tokens or cfg["max_tokens"],
+                "stream": True
             }
             
-            response = requests.post(
-                self.models["deepseek"]["models"][model]["url"],
+            with self._session.post(
+                cfg["url"],
                 headers=headers,
-                json=data,
-                timeout=30  # 设置超时时间
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result["choices"][0]["message"]["content"]
-            elif response.status_code == 401:
-                raise APIKeyError("DeepSeek API密钥无效")
-            else:
-                raise APIError(f"DeepSeek API调用失败: {response.text}")
+                data=orjson.dumps(data),
+                stream=True,
+                timeout=(5, 60)  # 连接超时5秒，两段数据之间最长等待60秒
+            ) as response:
+                if response.status_code == 401:
+                    raise APIKeyError("DeepSeek API密钥无效")
+                elif response.status_code != 200:
+                    raise APIError(f"DeepSeek API调用失败: {response.text}")
+                
+                for event in self._iter_sse_data(response):
+                    content = event["choices"][0]["delta"].get("content")
+                    if content:
+                        yield content
                 
         except requests.exceptions.Timeout:
             raise APIError("DeepSeek API调用超时")
@@ -107,19 +224,16 @@ class APICaller:
         except Exception as e:
             raise APIError(f"DeepSeek API调用错误: {str(e)}")
     
-    def _call_qwen(self, api_key: str, prompt: str, model: str = "qwen-turbo") -> str:
-        """调用Qwen API"""
+    def _stream_qwen(self, api_key: str, prompt: str, cfg: Dict[str, Any], max_tokens: Optional[int] = None) -> Iterator[str]:
+        """流式调用Qwen API，逐段返回生成内容"""
         try:
-            if model not in self.models["qwen"]["models"]:
-                raise ModelNotSupportedError(f"不支持的Qwen模型: {model}")
-            
             headers = {
                 "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json"
+                "X-DashScope-SSE": "enable"
             }
             
             data = {
-                "model": model,
+                "model": cfg["model"],
                 "input": {
                     "messages": [
                         {"role": "system", "content": "你是一个专业的试题转换助手，请严格按照要求转换试题格式。"},
@@ -128,24 +242,27 @@ class APICaller:
                 },
                 "parameters": {
                     "temperature": 0.3,  # 降低随机性
-                    "max_tokens": self.models["qwen"]["models"][model]["max_tokens"]
+                    "max_tokens": max_tokens or cfg["max_tokens"],
+                    "incremental_output": True  # 每个事件只返回新增内容
                 }
             }
             
-            response = requests.post(
-                self.models["qwen"]["models"][model]["url"],
+            with self._session.post(
+                cfg["url"],
                 headers=headers,
-                json=data,
-                timeout=30  # 设置超时时间
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result["output"]["text"]
-            elif response.status_code == 401:
-                raise APIKeyError("Qwen API密钥无效")
-            else:
-                raise APIError(f"Qwen API调用失败: {response.text}")
+                data=orjson.dumps(data),
+                stream=True,
+                timeout=(5, 60)  # 连接超时5秒，两段数据之间最长等待60秒
+            ) as response:
+                if response.status_code == 401:
+                    raise APIKeyError("Qwen API密钥无效")
+                elif response.status_code != 200:
+                    raise APIError(f"Qwen API调用失败: {response.text}")
+                
+                for event in self._iter_sse_data(response):
+                    content = event["output"].get("text")
+                    if content:
+                        yield content
                 
         except requests.exceptions.Timeout:
             raise APIError("Qwen API调用超时")
@@ -154,43 +271,62 @@ class APICaller:
         except Exception as e:
             raise APIError(f"Qwen API调用错误: {str(e)}")
     
-    def call_api(self, model_type: str, api_key: str, prompt: str, model: Optional[str] = None) -> str:
-        """调用API"""
-        if model_type not in self.models:
-            raise ModelNotSupportedError(f"不支持的模型类型: {model_type}")
+    def _resolve_model(self, model_type: str, model: Optional[str]) -> Dict[str, Any]:
+        """查找模型配置，一次查表同时完成模型类型和模型的校验"""
+        cfg = self._flat.get((model_type, model or DEFAULT_MODELS.get(model_type)))
+        if cfg is None:
+            if model_type not in self._providers:
+                raise ModelNotSupportedError(f"不支持的模型类型: {model_type}")
+            raise ModelNotSupportedError(f"不支持的{model_type}模型: {model}")
+        return cfg
+    
+    def stream_api(self, model_type: str, api_key: str, prompt: str, model: Optional[str] = None, max_tokens: Optional[int] = None) -> Iterator[str]:
+        """流式调用API，返回逐段生成内容的迭代器"""
+        cfg = self._resolve_model(model_type, model)
         
         if not api_key:
             raise APIKeyError("API密钥不能为空")
         
-        if model_type == "deepseek":
-            model = model or "deepseek-chat"
-            return self._call_deepseek(api_key, prompt, model)
-        
-        elif model_type == "qwen":
-            model = model or "qwen-turbo"
-            return self._call_qwen(api_key, prompt, model)
+        return self._dispatch[model_type](api_key, prompt, cfg, max_tokens)
+    
+    def call_api(self, model_type: str, api_key: str, prompt: str, model: Optional[str] = None, max_tokens: Optional[int] = None) -> str:
+        """调用API，max_tokens为空时使用模型默认上限"""
+        return "".join(self.stream_api(model_type, api_key, prompt, model, max_tokens))
     
     def get_available_models(self, model_type: str) -> Dict[str, Dict[str, Any]]:
         """获取可用的模型列表"""
-        if model_type not in self.models:
+        if model_type not in self._providers:
             raise ModelNotSupportedError(f"不支持的模型类型: {model_type}")
         return self.models[model_type]["models"]
     
     def get_model_info(self, model_type: str, model: str) -> Dict[str, Any]:
         """获取模型信息"""
-        if model_type not in self.models:
+        if model_type not in self._providers:
             raise ModelNotSupportedError(f"不支持的模型类型: {model_type}")
         
-        if model not in self.models[model_type]["models"]:
+        info = self._flat.get((model_type, model))
+        if info is None:
             raise ModelNotSupportedError(f"不支持的{model_type}模型: {model}")
         
-        return self.models[model_type]["models"][model]
+        return info
     
     def validate_api_key(self, model_type: str, api_key: str, model: Optional[str] = None) -> bool:
         """验证API密钥"""
         try:
-            test_prompt = "测试API连接"
-            self.call_api(model_type, api_key, test_prompt, model)
+            self._resolve_model(model_type, model)
+            if not api_key:
+                return False
+            
+            response = self._session.get(
+                _VALIDATE_URLS[model_type],
+                headers={"Authorization": f"Bearer {api_key}"},
+                timeout=5
+            )
+            if response.status_code != 404:
+                return response.status_code == 200
+            
+            # 鉴权接口不可用时退回到对话请求，只生成1个token以减少服务端计算和token消耗
+            self.call_api(model_type, api_key, "ping", model, max_tokens=1)
             return True
         except Exception:
-            return False 
\ No newline at end of file
+            return False
@@ -1,14 +1,22 @@
 import streamlit as st
 import json
-from typing import Dict, Any, List, Optional
+import orjson
+from typing import Callable, Dict, Any, List, Optional, Tuple, TYPE_CHECKING
 from config_manager import ConfigManager
 from schema_manager import SchemaManager
-from json_processor import JSONProcessor
-from excel_exporter import ExcelExporter
-from api_caller import APICaller, APIError, ModelNotSupportedError, APIKeyError
+from api_caller import APICaller, APIError, ModelNotSupportedError, APIKeyError, POOL_MAXSIZE
 from pages.题型管理 import QuestionTypeManager
 import tiktoken
 import re
+import hashlib
+import functools
+import queue
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+# Excel导出依赖较重，只在真正导出时才导入
+if TYPE_CHECKING:
+    from excel_exporter import ExcelExporter
 
 # 必须是第一个 Streamlit 命令
 st.set_page_config(
@@ -17,32 +25,155 @@ st.set_page_config(
     layout="wide"
 )
 
-# 隐藏 Streamlit 默认的多页面导航栏
-hide_streamlit_style = """
-    <style>
-    [data-testid="stSidebarNav"] {display: none;}
-    </style>
-"""
-st.markdown(hide_streamlit_style, unsafe_allow_html=True)
+@functools.lru_cache(maxsize=4)
+def _get_encoder(encoding: str) -> "tiktoken.Encoding":
+    """获取并缓存tiktoken编码器，避免每次统计都重新查找编码表"""
+    try:
+        return tiktoken.get_encoding(encoding)
+    except Exception:
+        return tiktoken.encoding_for_model('gpt-3.5-turbo')
+
+@functools.lru_cache(maxsize=256)
+def _count_tokens_cached(text: str, encoding: str = 'cl100k_base') -> int:
+    """统计提示词、Schema等固定文本的token数，按内容缓存；用户输入不走此缓存"""
+    return len(_get_encoder(encoding).encode(text))
+
+# 段落分隔：中间只有空白的连续换行
+_PARAGRAPH_SEP = re.compile(r'\n[ \t\r\f\v]*\n\s*')
+
+def _split_questions(input_text: str) -> List[str]:
+    """按空行或换行分割题目，去除空白"""
+    # 空行和单换行都作为分隔，等价于按换行切分后丢弃空白行；
+    # 只按\n切分，不用splitlines，以免\x0c、\u2028等字符改变题目边界
+    return [q for q in (line.strip() for line in input_text.split('\n')) if q]
+
+def _count_tokens_batch(texts: List[str], encoding: str = 'cl100k_base') -> List[int]:
+    """批量统计token数，编码器只查找一次，逐题编码"""
+    # 不用encode_ordinary_batch：它每次调用都新建线程池并逐题提交任务，短题目上开销大于编码本身
+    encode = _get_encoder(encoding).encode_ordinary
+    return [len(encode(text)) for text in texts]
+
+def _dedupe_paragraphs(input_text: str) -> Tuple[str, int]:
+    """按空行分段去除重复段落，返回去重后的文本和跳过的段落数"""
+    # 只在段落级别去重：逐行去重会误删不同题目中相同的选项行
+    seen = set()
+    paragraphs = []
+    removed = 0
+    for paragraph in _PARAGRAPH_SEP.split(input_text):
+        lines = [line.strip() for line in paragraph.splitlines() if line.strip()]
+        if not lines:
+            continue
+        digest = hashlib.blake2b('\n'.join(lines).encode(), digest_size=16).digest()
+        if digest in seen:
+            removed += 1
+            continue
+        seen.add(digest)
+        paragraphs.append(paragraph)
+    return '\n\n'.join(paragraphs), removed
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _split_and_count(input_text: str) -> Tuple[List[str], List[int], int]:
+    """去重、分割题目并统计每题token数，相同输入重复处理时直接使用缓存"""
+    text, removed = _dedupe_paragraphs(input_text)
+    questions = _split_questions(text)
+    return questions, _count_tokens_batch(questions), removed
+
+@st.cache_resource
+def _get_config_manager() -> ConfigManager:
+    """进程级共享的配置管理器"""
+    return ConfigManager()
+
+@st.cache_resource
+def _get_schema_manager() -> SchemaManager:
+    """进程级共享的Schema管理器"""
+    return SchemaManager()
+
+@st.cache_resource
+def _get_api_caller() -> APICaller:
+    """进程级共享的API调用器，HTTP连接池在多次重跑之间保持复用"""
+    return APICaller()
+
+@st.cache_resource
+def _get_excel_exporter() -> "ExcelExporter":
+    """进程级共享的Excel导出器，首次导出时才导入相关模块"""
+    from excel_exporter import ExcelExporter
+    return ExcelExporter()
+
+@st.cache_data(show_spinner=False, ttl=3600, max_entries=256)
+def _cached_call(
+    model_type: str,
+    model: str,
+    prompt: str,
+    api_key_hash: str,
+    _api_key: str,
+    attempt: int = 0,
+    _on_chunk: Optional[Callable[[str], None]] = None
+) -> str:
+    """按(模型, 提示词, 密钥摘要, 重试次数)缓存API结果，相同输入重复点击时不再请求网络"""
+    # 以下划线开头的参数不参与缓存键计算，密钥本身不会进入缓存；
+    # 函数内不调用任何st元素，缓存中只保存返回的字符串，未命中缓存时通过_on_chunk转发流式片段
+    chunks = []
+    for chunk in _get_api_caller().stream_api(model_type, _api_key, prompt, model):
+        chunks.append(chunk)
+        if _on_chunk is not None:
+            _on_chunk(chunk)
+    response = "".join(chunks)
+    # 抛出异常时Streamlit不会缓存结果，空响应下次点击可直接重试
+    if not response:
+        raise APIError("AI返回为空")
+    return response
+
+def _prompt_digest(model_type: str, model: str, prompt: str) -> str:
+    """提示词摘要，用于在会话中记录各批次的重试次数"""
+    return hashlib.blake2b(f"{model_type}\0{model}\0{prompt}".encode(), digest_size=16).hexdigest()
+
+def _stream_cached_call(model_type: str, model: str, prompt: str, api_key_hash: str, api_key: str, attempt: int = 0) -> str:
+    """调用_cached_call并显示AI响应：未命中缓存时实时显示流式输出，命中缓存时直接显示缓存结果"""
+    # 请求放在工作线程中执行，主线程负责刷新界面，界面更新不会被记录进缓存
+    chunks = queue.SimpleQueue()
+    placeholder = st.empty()
+    with ThreadPoolExecutor(
+        max_workers=1,
+        initializer=add_script_run_ctx,
+        initargs=(None, get_script_run_ctx())
+    ) as executor:
+        future = executor.submit(_cached_call, model_type, model, prompt, api_key_hash, api_key, attempt, chunks.put)
+        text = ""
+        while not future.done() or not chunks.empty():
+            try:
+                text += chunks.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            # 合并已到达的片段，每次刷新只发送一次完整文本
+            while not chunks.empty():
+                text += chunks.get_nowait()
+            placeholder.code(text, language="json")
+    api_response = future.result()
+    placeholder.code(api_response, language="json")
+    return api_response
 
 class App:
     """试题推土机主程序"""
     
     def __init__(self):
         """初始化应用"""
-        # 初始化组件
-        self.config = ConfigManager()
-        self.schema_manager = SchemaManager()
-        self.api_caller = APICaller()
+        # 初始化组件（共享实例在Streamlit每次重跑之间复用）
+        self.config = _get_config_manager()
+        self.schema_manager = _get_schema_manager()
+        # 共享实例不会自动感知其他页面或进程对Schema文件的修改，每次重跑时按修改时间检查
+        self.schema_manager.reload_if_changed()
+        self.api_caller = _get_api_caller()
         self.json_processor = None  # 延迟初始化
-        self.excel_exporter = ExcelExporter()
-        self.question_type_manager = QuestionTypeManager()
+        self.excel_exporter = None  # 首次导出时初始化
+        # 题型管理页会初始化会话状态，需每次构造，但与主程序共用同一个Schema管理器
+        self.question_type_manager = QuestionTypeManager(self.schema_manager)
         
         # 初始化会话状态
         if "api_response" not in st.session_state:
             st.session_state.api_response = None
         if "processed_data" not in st.session_state:
             st.session_state.processed_data = None
+            st.session_state.processed_data_json = None
         if "current_tab" not in st.session_state:
             st.session_state.current_tab = "转换"
     
@@ -101,36 +232,53 @@ class App:
             model_info = self.api_caller.get_model_info(model_type, model)
             st.info(f"模型说明：{model_info['description']}")
             
-            # 从配置中加载已保存的API密钥
-            saved_api_key = self.config.get_api_key(model_type)
+            # 每个会话只从配置中加载一次已保存的API密钥
+            if "api_keys_cache" not in st.session_state:
+                st.session_state.api_keys_cache = {
+                    mt: self.config.get_api_key(mt) for mt in ["deepseek", "qwen"]
+                }
+            saved_api_key = st.session_state.api_keys_cache[model_type]
             
-            # API密钥输入
+            # API密钥输入，仅在输入提交且内容变化时保存
             api_key = st.text_input(
                 "输入API密钥",
                 value=saved_api_key,
                 type="password",
-                help="输入对应模型的API密钥，输入后会自动保存"
+                help="输入对应模型的API密钥，输入后会自动保存",
+                key=f"api_key_{model_type}",
+                on_change=self._save_api_key,
+                args=(model_type,)
             )
             
-            # 如果API密钥发生变化，自动保存
-            if api_key != saved_api_key:
-                try:
-                    self.config.save_api_key(model_type, api_key)
-                    if api_key:  # 只在有输入时显示提示
-                        st.success("API密钥已自动保存")
-                except Exception as e:
-                    st.error(f"保存API密钥失败：{str(e)}")
+            # 显示保存结果
+            save_result = st.session_state.pop("api_key_save_result", None)
+            if save_result:
+                status, message = save_result
+                if status == "success":
+                    st.success(message)
+                else:
+                    st.error(message)
             
             # 选择题型
-            schema_types = self.schema_manager.get_all_schema_types()
-            schema_names = {st: self.schema_manager.get_schema_name(st) for st in schema_types}
+            schema_names, name_to_type = self.schema_manager.get_schema_names()
             selected_name = st.selectbox(
                 "选择题型",
                 list(schema_names.values()),
                 help="选择要处理的试题类型"
             )
             # 根据中文名反查题型代码
-            question_type = next(k for k, v in schema_names.items() if v == selected_name)
+            question_type = name_to_type[selected_name]
+            
+            # 分批处理时同时请求的批次数
+            st.number_input(
+                "并发批次数",
+                min_value=1,
+                max_value=8,
+                value=4,
+                step=1,
+                key="max_concurrency",
+                help="分批处理时同时请求的批次数，遇到接口限流时请调低"
+            )
             
             # 验证API密钥
             if st.button("验证API密钥"):
@@ -142,19 +290,67 @@ class App:
             
             return model_type, model, api_key, question_type
     
-    def split_questions(self, input_text: str) -> list:
-        """按空行或换行分割题目，去除空白"""
-        # 支持空行或单换行分割
-        questions = [q.strip() for q in re.split(r'\n\s*\n|\r\n\s*\r\n|\n|\r\n', input_text.strip()) if q.strip()]
-        return questions
+    def _save_api_key(self, model_type: str):
+        """API密钥输入变化时的回调，内容与已保存的一致时不写配置文件"""
+        api_key = st.session_state[f"api_key_{model_type}"]
+        if api_key == st.session_state.api_keys_cache.get(model_type):
+            return
+        try:
+            self.config.save_api_key(model_type, api_key)
+            st.session_state.api_keys_cache[model_type] = api_key
+            if api_key:  # 只在有输入时显示提示
+                st.session_state.api_key_save_result = ("success", "API密钥已自动保存")
+        except Exception as e:
+            st.session_state.api_key_save_result = ("error", f"保存API密钥失败：{str(e)}")
 
-    def count_tokens(self, text: str, encoding: str = 'cl100k_base') -> int:
-        """用tiktoken统计token数，默认兼容openai/deepseek/qwen"""
+    def estimate_tokens(self, text: str) -> int:
+        """按UTF-8字节数粗略估算token数，用于实时预估"""
+        return len(text.encode('utf-8')) // 3
+
+    @staticmethod
+    def pack_batches(questions: List[str], lengths: List[int], limit: int) -> List[List[str]]:
+        """按顺序贪心装箱，保证每批token数不超过上限（单题超限时独占一批）"""
+        batches = []
+        start = 0
+        current_tokens = 0
+        for i, q_tokens in enumerate(lengths):
+            if current_tokens + q_tokens > limit and i > start:
+                batches.append(questions[start:i])
+                start = i
+                current_tokens = 0
+            current_tokens += q_tokens
+        if start < len(questions):
+            batches.append(questions[start:])
+        return batches
+
+    def _process_batch_response(self, idx: int, api_response: str) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """处理单批AI响应，返回解析出的试题和错误信息，不操作界面"""
+        if not api_response:
+            return [], [f"第{idx+1}批AI返回为空"]
         try:
-            enc = tiktoken.get_encoding(encoding)
-        except Exception:
-            enc = tiktoken.encoding_for_model('gpt-3.5-turbo')
-        return len(enc.encode(text))
+            processed_data = self.json_processor.process_json(api_response)
+            if processed_data:
+                return (processed_data if isinstance(processed_data, list) else [processed_data]), []
+            return [], [f"第{idx+1}批JSON处理失败！", self.json_processor.get_formatted_errors()]
+        except json.JSONDecodeError as e:
+            return [], [f"第{idx+1}批JSON解析失败：{str(e)}"]
+        except Exception as e:
+            return [], [f"第{idx+1}批JSON处理过程中出现错误：{str(e)}"]
+
+    def _show_batch_result(self, idx: int, items: List[Dict[str, Any]], errors: List[str], all_results: List[Dict[str, Any]]):
+        """显示单批处理结果，成功的试题追加到all_results"""
+        for error in errors:
+            st.error(error)
+        if items:
+            all_results.extend(items)
+            st.success(f"第{idx+1}批处理成功！")
+
+    def count_template_tokens(self, question_type: str) -> Tuple[int, int]:
+        """统计提示词和Schema的token数，内容不变时直接使用进程级缓存"""
+        return (
+            _count_tokens_cached(self.schema_manager.get_prompt(question_type)),
+            _count_tokens_cached(self.schema_manager.get_schema_json(question_type))
+        )
 
     def get_model_max_tokens(self, model_type: str) -> int:
         """根据模型类型返回最大token数"""
@@ -174,13 +370,11 @@ class App:
             help="输入要转换的试题文本，支持多个试题（可用换行或空行分隔）"
         )
 
-        # 实时token统计与分批预估
+        # 实时token统计与分批预估，输入部分按字节数估算（cl100k中英文混排平均约3字节/token），
+        # 精确统计只在开始处理时进行
         if input_text:
-            schema = self.schema_manager.get_schema(question_type)
-            prompt_template = self.schema_manager.get_prompt(question_type)
-            prompt_tokens = self.count_tokens(prompt_template)
-            schema_tokens = self.count_tokens(json.dumps(schema, ensure_ascii=False))
-            total_tokens = prompt_tokens + schema_tokens + self.count_tokens(input_text)
+            prompt_tokens, schema_tokens = self.count_template_tokens(question_type)
+            total_tokens = prompt_tokens + schema_tokens + self.estimate_tokens(input_text)
             max_tokens = self.get_model_max_tokens(model_type)
             st.info(f"当前输入总token数约：{total_tokens} / {max_tokens}")
             if total_tokens > max_tokens:
@@ -197,72 +391,118 @@ class App:
             if not schema:
                 st.error("加载Schema失败！")
                 return
-            self.json_processor = JSONProcessor(schema)
-            # 自动分批处理
-            questions = self.split_questions(input_text)
+            from json_processor import JSONProcessor
+            self.json_processor = JSONProcessor(schema, validator=self.schema_manager.get_validator(question_type))
+            # 自动分批处理，按题批量精确统计token
+            questions, question_tokens, duplicates = _split_and_count(input_text)
+            if duplicates:
+                st.info(f"已跳过{duplicates}段重复的试题")
             prompt_template = self.schema_manager.get_prompt(question_type)
-            prompt_tokens = self.count_tokens(prompt_template)
-            schema_tokens = self.count_tokens(json.dumps(schema, ensure_ascii=False))
+            prompt_tokens, schema_tokens = self.count_template_tokens(question_type)
             max_tokens = self.get_model_max_tokens(model_type)
             safety_margin = 0.15
             batch_token_limit = int(max_tokens * (1 - safety_margin)) - prompt_tokens - schema_tokens
-            batches = []
-            current_batch = []
-            current_tokens = 0
-            for q in questions:
-                q_tokens = self.count_tokens(q)
-                if current_tokens + q_tokens > batch_token_limit and current_batch:
-                    batches.append(current_batch)
-                    current_batch = []
-                    current_tokens = 0
-                current_batch.append(q)
-                current_tokens += q_tokens
-            if current_batch:
-                batches.append(current_batch)
+            if not questions:
+                st.warning("未识别到试题，请检查输入内容！")
+                return
+            if batch_token_limit <= 0:
+                st.error("当前题型的提示词和Schema已超出模型最大处理能力，请精简后重试！")
+                return
+            # 单题超过每批上限时请求必然失败，提前提示而不是发出注定失败的请求
+            oversized = [i for i, q_tokens in enumerate(question_tokens) if q_tokens > batch_token_limit]
+            if oversized:
+                st.error(
+                    f"第{'、'.join(str(i + 1) for i in oversized)}题超过单批上限（{batch_token_limit} token），"
+                    "请拆分后重试！"
+                )
+                return
+            batches = self.pack_batches(questions, question_tokens, batch_token_limit)
+            api_key_hash = hashlib.sha256(api_key.encode()).hexdigest()
+            # 模板只切分一次，每批直接拼接，与replace结果一致（包括多处或没有占位符的情况）
+            template_parts = prompt_template.split('{text}')
+            prompts = ['\n\n'.join(batch).join(template_parts) for batch in batches]
+            # 并发数不超过连接池大小，保证每个请求都能复用已建立的连接
+            max_workers = min(st.session_state.get("max_concurrency", 4), len(prompts), POOL_MAXSIZE)
             all_results = []
-            for idx, batch in enumerate(batches):
-                batch_text = '\n\n'.join(batch)
-                prompt = prompt_template.replace('{text}', batch_text)
-                with st.spinner(f"正在处理第{idx+1}/{len(batches)}批..."):
-                    try:
-                        api_response = self.api_caller.call_api(
-                            model_type,
-                            api_key,
-                            prompt,
-                            model
-                        )
-                        if not api_response:
-                            st.error(f"第{idx+1}批AI返回为空")
+            # 解析或验证失败的批次增加重试次数，下次点击时换用新的缓存键重新请求，不再回放已缓存的错误结果
+            retries = st.session_state.setdefault("api_retries", {})
+            digests = [_prompt_digest(model_type, model, prompt) for prompt in prompts]
+            if max_workers <= 1:
+                for idx, prompt in enumerate(prompts):
+                    with st.spinner(f"正在处理第{idx+1}/{len(prompts)}批..."):
+                        try:
+                            # 流式显示AI响应，首段内容到达即可看到输出
+                            with st.expander(f"查看第{idx+1}批API响应", expanded=True):
+                                api_response = _stream_cached_call(
+                                    model_type,
+                                    model,
+                                    prompt,
+                                    api_key_hash,
+                                    api_key,
+                                    retries.get(digests[idx], 0)
+                                )
+                        except (APIError, ModelNotSupportedError, APIKeyError) as e:
+                            st.error(f"第{idx+1}批API错误：{str(e)}")
                             continue
-                        with st.expander(f"查看第{idx+1}批API响应"):
-                            st.text(api_response)
+                        except Exception as e:
+                            st.error(f"第{idx+1}批处理过程中出现错误：{str(e)}")
+                            continue
+                        items, errors = self._process_batch_response(idx, api_response)
+                        if not items:
+                            retries[digests[idx]] = retries.get(digests[idx], 0) + 1
+                        self._show_batch_result(idx, items, errors, all_results)
+            else:
+                # 多批次并发请求，每批返回后立即在主线程解析JSON，与其余批次的网络等待重叠；
+                # 工作线程不能操作界面，结果收齐后按批次顺序显示
+                outcomes = {}
+                progress = st.progress(0.0, text=f"正在并发处理{len(prompts)}批...")
+                # 工作线程挂上当前脚本上下文，缓存才能在线程中正常读写
+                with ThreadPoolExecutor(
+                    max_workers=max_workers,
+                    initializer=add_script_run_ctx,
+                    initargs=(None, get_script_run_ctx())
+                ) as executor:
+                    pending = {
+                        executor.submit(
+                            _cached_call, model_type, model, prompt, api_key_hash, api_key, retries.get(digests[idx], 0)
+                        ): idx
+                        for idx, prompt in enumerate(prompts)
+                    }
+                    for done, future in enumerate(as_completed(pending), 1):
+                        idx = pending[future]
                         try:
-                            processed_data = self.json_processor.process_json(api_response)
-                            if processed_data:
-                                all_results.extend(processed_data if isinstance(processed_data, list) else [processed_data])
-                                st.success(f"第{idx+1}批处理成功！")
-                            else:
-                                st.error(f"第{idx+1}批JSON处理失败！")
-                                st.error(self.json_processor.get_formatted_errors())
-                        except json.JSONDecodeError as e:
-                            st.error(f"第{idx+1}批JSON解析失败：{str(e)}")
+                            api_response = future.result()
+                        except (APIError, ModelNotSupportedError, APIKeyError) as e:
+                            outcomes[idx] = (None, [], [f"第{idx+1}批API错误：{str(e)}"])
                         except Exception as e:
-                            st.error(f"第{idx+1}批JSON处理过程中出现错误：{str(e)}")
-                    except (APIError, ModelNotSupportedError, APIKeyError) as e:
-                        st.error(f"第{idx+1}批API错误：{str(e)}")
-                    except Exception as e:
-                        st.error(f"第{idx+1}批处理过程中出现错误：{str(e)}")
+                            outcomes[idx] = (None, [], [f"第{idx+1}批处理过程中出现错误：{str(e)}"])
+                        else:
+                            outcomes[idx] = (api_response, *self._process_batch_response(idx, api_response))
+                            if not outcomes[idx][1]:
+                                retries[digests[idx]] = retries.get(digests[idx], 0) + 1
+                        progress.progress(done / len(prompts), text=f"已完成{done}/{len(prompts)}批")
+                progress.empty()
+                for idx in range(len(prompts)):
+                    api_response, items, errors = outcomes[idx]
+                    if api_response is not None:
+                        with st.expander(f"查看第{idx+1}批API响应"):
+                            st.code(api_response, language="json")
+                    self._show_batch_result(idx, items, errors, all_results)
             if all_results:
                 st.session_state.processed_data = all_results
+                # 结果只序列化一次，之后每次重跑直接把字符串交给st.json
+                st.session_state.processed_data_json = orjson.dumps(all_results, option=orjson.OPT_NON_STR_KEYS).decode()
                 st.success("全部批次处理完成！")
         # 显示处理结果
         if st.session_state.processed_data:
             st.header("📊 处理结果")
             with st.expander("查看JSON数据"):
-                st.json(st.session_state.processed_data)
+                st.json(st.session_state.get("processed_data_json") or st.session_state.processed_data)
             if st.button("导出到Excel"):
                 with st.spinner("正在生成Excel文件..."):
                     try:
+                        if self.excel_exporter is None:
+                            self.excel_exporter = _get_excel_exporter()
                         excel_data, filename = self.excel_exporter.export_to_excel(
                             st.session_state.processed_data,
                             question_type
@@ -324,18 +564,18 @@ class App:
             if schema_str and prompt_template:
                 with st.expander("👀 预览配置", expanded=False):
                     try:
-                        schema = json.loads(schema_str)
-                        st.json({"schema": schema, "prompt_template": prompt_template})
+                        schema = orjson.loads(schema_str)
+                        st.json(orjson.dumps({"schema": schema, "prompt_template": prompt_template}).decode())
                     except Exception:
                         st.warning("Schema不是有效的JSON格式")
             # 提交按钮
             created = st.form_submit_button("💾 创建题型")
             if created:
                 try:
-                    if not all([type_code, type_name, type_desc, schema_str, prompt_template]):
+                    if not type_code or not type_name or not type_desc or not schema_str or not prompt_template:
                         st.error("请填写所有必要信息")
                         return
-                    schema = json.loads(schema_str)
+                    schema = orjson.loads(schema_str)
                     self.schema_manager.add_custom_schema(
                         name=type_code,
                         description=type_name,
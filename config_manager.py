@@ -1,5 +1,7 @@
-import json
 import os
+import tempfile
+import threading
+import orjson
 from typing import Dict, Any, Optional
 
 class ConfigManager:
@@ -8,6 +10,8 @@ class ConfigManager:
     def __init__(self):
         """初始化配置管理器"""
         self.config_file = "config.json"
+        self._saved_content: Optional[bytes] = None
+        self._lock = threading.Lock()  # 实例由所有会话共享，保存在锁内进行
         self.config = self._load_config()
     
     def _load_config(self) -> Dict[str, Any]:
@@ -27,8 +31,8 @@ class ConfigManager:
         
         if os.path.exists(self.config_file):
             try:
-                with open(self.config_file, "r", encoding="utf-8") as f:
-                    config = json.load(f)
+                with open(self.config_file, "rb") as f:
+                    config = orjson.loads(f.read())
                     # 合并默认配置，确保所有必要的字段都存在
                     return {**default_config, **config}
             except Exception as e:
@@ -39,11 +43,28 @@ class ConfigManager:
     def _save_config(self) -> None:
         """保存配置到文件"""
         try:
-            # 确保配置目录存在
-            os.makedirs(os.path.dirname(self.config_file), exist_ok=True)
-            
-            with open(self.config_file, "w", encoding="utf-8") as f:
-                json.dump(self.config, f, ensure_ascii=False, indent=2)
+            with self._lock:
+                content = orjson.dumps(self.config, option=orjson.OPT_INDENT_2)
+                # 内容与上次保存的一致时不再写文件
+                if content == self._saved_content:
+                    return
+                
+                # 确保配置目录存在（配置文件在当前目录时无需创建）
+                config_dir = os.path.dirname(self.config_file)
+                if config_dir:
+                    os.makedirs(config_dir, exist_ok=True)
+                
+                # 先写同目录下名称唯一的临时文件再替换，避免写入中断时留下不完整的配置，
+                # 多个实例同时保存时也不会互相覆盖临时文件
+                fd, tmp_file = tempfile.mkstemp(dir=config_dir or ".", suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "wb") as f:
+                        f.write(content)
+                    os.replace(tmp_file, self.config_file)
+                except BaseException:
+                    os.unlink(tmp_file)
+                    raise
+                self._saved_content = content
         except Exception as e:
             raise Exception(f"保存配置文件失败：{str(e)}")
     
@@ -117,5 +138,6 @@ class ConfigManager:
         """重置配置为默认值"""
         if os.path.exists(self.config_file):
             os.remove(self.config_file)
+        self._saved_content = None
         self.config = self._load_config()
         self._save_config() 
\ No newline at end of file
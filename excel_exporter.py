@@ -1,14 +1,18 @@
-from typing import List, Dict, Any, Union
+from typing import List, Dict, Any, Union, Callable
 import openpyxl
 from openpyxl.styles import Font, Alignment, PatternFill
 from openpyxl.utils import get_column_letter
-import pandas as pd
+from openpyxl.cell import WriteOnlyCell
 from datetime import datetime
 import io
+import functools
 import logging
 import os
 from config_manager import ConfigManager
 
+# 可直接写入单元格的值类型，其余（如字典、列表）转为字符串后写入
+_CELL_TYPES = (str, int, float, bool, type(None))
+
 class ExcelExporter:
     """Excel导出类"""
     
@@ -17,6 +21,7 @@ class ExcelExporter:
         self.logger = logging.getLogger(__name__)
         self.config = ConfigManager()
         self.header_fill = PatternFill(start_color="CCE5FF", end_color="CCE5FF", fill_type="solid")
+        # 表头字体只创建一次；Font不可变，可在多个工作簿和会话之间共用
         self.header_font = Font(bold=True)
 
     def _format_single_choice(self, data: Dict[str, Any]) -> Dict[str, Any]:
@@ -98,6 +103,20 @@ class ExcelExporter:
         
         return formatted
     
+    def _get_formatter(self, question_type: str) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+        """根据题型获取对应的格式化函数"""
+        formatters = {
+            "single_choice": self._format_single_choice,
+            "multiple_choice": self._format_multiple_choice,
+            "true_false": self._format_true_false
+        }
+        return formatters.get(question_type) or functools.partial(self._format_custom, question_type=question_type)
+
+    @staticmethod
+    def _to_cell_value(value: Any) -> Any:
+        """转换为可写入单元格的值，字典、列表等转为字符串"""
+        return value if isinstance(value, _CELL_TYPES) else str(value)
+
     def _get_export_filename(self, question_type: str) -> str:
         """生成导出文件名"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -112,19 +131,12 @@ class ExcelExporter:
             if isinstance(data, dict):
                 data = [data]
             
-            # 格式化数据
+            # 格式化数据，格式化函数在循环外确定
+            formatter = self._get_formatter(question_type)
             formatted_data = []
             for item in data:
                 try:
-                    if question_type == "single_choice":
-                        formatted = self._format_single_choice(item)
-                    elif question_type == "multiple_choice":
-                        formatted = self._format_multiple_choice(item)
-                    elif question_type == "true_false":
-                        formatted = self._format_true_false(item)
-                    else:
-                        formatted = self._format_custom(item, question_type)
-                    formatted_data.append(formatted)
+                    formatted_data.append(formatter(item))
                 except Exception as e:
                     self.logger.error(f"格式化数据项失败: {str(e)}")
                     raise Exception(f"格式化数据失败：{str(e)}")
@@ -132,20 +144,30 @@ class ExcelExporter:
             if not formatted_data:
                 raise Exception("没有可导出的数据")
             
-            # 创建DataFrame
-            df = pd.DataFrame(formatted_data)
+            # 表头为所有数据项字段的并集，按首次出现的顺序排列
+            headers = list(dict.fromkeys(key for row in formatted_data for key in row))
             
             # 生成文件名
             filename = self._get_export_filename(question_type)
             
-            # 创建字节流
-            excel_buffer = io.BytesIO()
-            
-            # 导出到字节流
+            # 以只写模式逐行写入，避免逐单元格的样式处理
             self.logger.info("正在生成Excel文件")
-            df.to_excel(excel_buffer, index=False, engine='openpyxl')
+            workbook = openpyxl.Workbook(write_only=True)
+            worksheet = workbook.create_sheet("Sheet1")
+            
+            header_row = []
+            for header in headers:
+                cell = WriteOnlyCell(worksheet, value=header)
+                cell.font = self.header_font
+                header_row.append(cell)
+            worksheet.append(header_row)
             
-            # 获取字节数据
+            for row in formatted_data:
+                worksheet.append([self._to_cell_value(row.get(header)) for header in headers])
+            
+            # 导出到字节流并获取字节数据
+            excel_buffer = io.BytesIO()
+            workbook.save(excel_buffer)
             excel_data = excel_buffer.getvalue()
             
             self.logger.info("导出成功")
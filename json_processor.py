@@ -1,30 +1,190 @@
-from typing import Dict, Any, List, Optional, Union
-import json
-from jsonschema import validate, ValidationError, Draft7Validator
+from typing import Callable, Dict, Any, Iterator, List, Optional, Protocol, Tuple, Union
+import orjson
+from jsonschema import ValidationError, Draft7Validator
+from jsonschema.validators import extend, validator_for
+import functools
+import re
+import string
+
+# 选项编号，列表格式的选项按顺序对应A-Z
+_OPTION_KEYS = string.ascii_uppercase
+
+# 导出Excel时选项编号对应的列名
+_OPTION_COLUMNS = {option: f"选项{option}" for option in "ABCDE"}
+
+
+class SchemaValidator(Protocol):
+    """验证器接口：jsonschema的验证器和_FastValidator都提供这两个方法"""
+
+    def is_valid(self, instance: Any) -> bool: ...
+
+    def iter_errors(self, instance: Any) -> Iterator[ValidationError]: ...
+
+
+try:
+    import jsonschema_rs  # 可选依赖，安装后用Rust实现加速验证
+except ImportError:
+    jsonschema_rs = None
+
+try:
+    import fastjsonschema  # 可选依赖，未安装jsonschema_rs时用生成的Python验证函数加速验证
+except ImportError:
+    fastjsonschema = None
+
+
+class _CompiledValidator:
+    """把fastjsonschema生成的验证函数包装成is_valid接口"""
+
+    def __init__(self, validate: Callable[[Any], Any]):
+        self._validate = validate
+
+    def is_valid(self, instance: Any) -> bool:
+        try:
+            self._validate(instance)
+        except fastjsonschema.JsonSchemaValueException:
+            return False
+        return True
+
+
+class _FastValidator:
+    """用jsonschema_rs或fastjsonschema判断是否有效，错误详情仍由jsonschema生成，保持错误信息格式不变"""
+
+    def __init__(self, fast_validator: Any, validator: SchemaValidator):
+        self._fast_validator = fast_validator
+        self._validator = validator
+
+    def is_valid(self, instance: Any) -> bool:
+        # 快速验证器判定无效时再用jsonschema复核，以免误拒；
+        # 快速验证器判定有效时直接采信，不再复核，两者不一致时可能放过jsonschema会拒绝的数据
+        return self._fast_validator.is_valid(instance) or self._validator.is_valid(instance)
+
+    def iter_errors(self, instance: Any) -> Iterator[ValidationError]:
+        return self._validator.iter_errors(instance)
+
+
+@functools.lru_cache(maxsize=1024)
+def _pattern_matches(pattern: str, value: str) -> bool:
+    """缓存正则匹配结果；选项编号、答案等取值有限，同一组合只匹配一次"""
+    return re.search(pattern, value) is not None
+
+
+def _pattern_properties(validator, pattern_properties, instance, schema):
+    """patternProperties关键字，与jsonschema实现一致，匹配结果走缓存"""
+    if not validator.is_type(instance, "object"):
+        return
+    for pattern, subschema in pattern_properties.items():
+        for key, value in instance.items():
+            if _pattern_matches(pattern, key):
+                yield from validator.descend(value, subschema, path=key, schema_path=pattern)
+
+
+def _pattern(validator, pattern, instance, schema):
+    """pattern关键字，与jsonschema实现一致，匹配结果走缓存"""
+    if validator.is_type(instance, "string") and not _pattern_matches(pattern, instance):
+        yield ValidationError(f"{instance!r} does not match {pattern!r}")
+
+
+_CachedDraft7Validator = extend(
+    Draft7Validator,
+    {"patternProperties": _pattern_properties, "pattern": _pattern}
+)
+
+
+@functools.lru_cache(maxsize=64)
+def _make_validator(schema_key: str) -> SchemaValidator:
+    """根据Schema的规范化JSON创建验证器，相同Schema只编译一次"""
+    schema = orjson.loads(schema_key)
+    validator_class = validator_for(schema, default=Draft7Validator)
+    if validator_class is not Draft7Validator:
+        return validator_class(schema)
+    
+    validator = _CachedDraft7Validator(schema)
+    if jsonschema_rs is not None:
+        try:
+            # 与jsonschema默认行为一致，不校验format
+            return _FastValidator(jsonschema_rs.Draft7Validator(schema, validate_formats=False), validator)
+        except Exception:
+            pass
+    if fastjsonschema is not None:
+        try:
+            # 不填充默认值、不校验format，与jsonschema默认行为一致
+            compiled = fastjsonschema.compile(schema, use_default=False, use_formats=False)
+            return _FastValidator(_CompiledValidator(compiled), validator)
+        except Exception:
+            pass
+    return validator
+
+
+@functools.lru_cache(maxsize=64)
+def _check_schema(schema_key: str) -> bool:
+    """检查Schema本身是否符合规范；检查通过的结果会被缓存，失败时每次都抛出异常"""
+    Draft7Validator.check_schema(orjson.loads(schema_key))
+    return True
+
+
+def _schema_key(schema: Dict[str, Any]) -> str:
+    """Schema的规范化JSON，键顺序不同的相同Schema得到相同结果"""
+    return orjson.dumps(schema, option=orjson.OPT_SORT_KEYS).decode()
+
+
+def get_validator(schema: Dict[str, Any]) -> SchemaValidator:
+    """获取Schema对应的缓存验证器（未声明$schema时按Draft7处理）"""
+    return _make_validator(_schema_key(schema))
+
 
 class JSONProcessor:
     """JSON处理类"""
     
-    def __init__(self, schema: Dict[str, Any]):
-        """初始化JSON处理器"""
+    def __init__(
+        self,
+        schema: Dict[str, Any],
+        collect_errors: bool = True,
+        debug: bool = False,
+        validator: Optional[SchemaValidator] = None
+    ):
+        """初始化JSON处理器，collect_errors为False时验证失败不记录详细错误，debug为True时记录格式转换过程，
+        validator为调用方已缓存的验证器（如SchemaManager.get_validator）"""
         self.schema = schema
         self.errors = []
-        self.validator = Draft7Validator(schema)
+        self.collect_errors = collect_errors
+        self.debug = debug
+        self.validator = validator or get_validator(schema)
+    
+    def _do_validate(
+        self,
+        instance: Any,
+        validator: Optional[SchemaValidator] = None,
+        *,
+        raise_on_error: bool = False,
+        on_error: Optional[Callable[[ValidationError], None]] = None
+    ) -> bool:
+        """统一的验证入口，默认使用本处理器的缓存验证器
+
+        先用is_valid快速判断，只在验证失败时才生成第一个错误：
+        raise_on_error为True时抛出ValueError，否则交给on_error记录
+        """
+        validator = validator or self.validator
+        if validator.is_valid(instance):
+            return True
+        if raise_on_error:
+            raise ValueError(f"JSON验证失败: {str(next(validator.iter_errors(instance)))}")
+        if on_error is not None and self.collect_errors:
+            on_error(next(validator.iter_errors(instance)))
+        return False
+    
+    def _record_error(self, error: ValidationError) -> None:
+        """记录验证错误的文本"""
+        self.errors.append(str(error))
     
     def _validate_json(self, data: Union[Dict[str, Any], List[Dict[str, Any]]]) -> bool:
         """验证JSON数据是否符合Schema"""
         self.errors = []
         
         try:
-            if isinstance(data, list):
-                for item in data:
-                    self.validator.validate(item)
-            else:
-                self.validator.validate(data)
-            return True
-        except ValidationError as e:
-            self.errors.append(str(e))
-            return False
+            return all(
+                self._do_validate(item, on_error=self._record_error)
+                for item in (data if isinstance(data, list) else [data])
+            )
         except Exception as e:
             self.errors.append(f"验证失败：{str(e)}")
             return False
@@ -33,7 +193,7 @@ class JSONProcessor:
         """格式化选项数据"""
         if isinstance(options, list):
             # 将列表转换为字典格式
-            return {chr(65 + i): opt for i, opt in enumerate(options) if i < 26}
+            return dict(zip(_OPTION_KEYS, options))
         elif isinstance(options, dict):
             # 确保键是大写字母
             return {k.upper(): v for k, v in options.items()}
@@ -42,9 +202,16 @@ class JSONProcessor:
     
     def _format_answer(self, answer: Union[str, List[str], bool]) -> Union[str, List[str], bool]:
         """格式化答案数据"""
+        # 答案通常已是大写选项编号，此时直接返回，不再创建新字符串
         if isinstance(answer, str):
-            return answer.upper()
+            return answer if answer.isupper() else answer.upper()
         elif isinstance(answer, list):
+            # 拼接后一次性检查和转换大写；元素自身含逗号时无法按逗号拆回，逐个处理
+            joined = ",".join(answer)
+            if joined.isupper():
+                return answer
+            if joined.count(",") == len(answer) - 1:
+                return joined.upper().split(",") if answer else []
             return [a.upper() for a in answer]
         elif isinstance(answer, bool):
             return answer
@@ -53,23 +220,26 @@ class JSONProcessor:
     
     def process_json(self, json_str: str) -> Optional[Union[Dict[str, Any], List[Dict[str, Any]]]]:
         """处理JSON字符串"""
+        # 错误信息只针对本次处理的内容
+        self.errors = []
         try:
             # 尝试解析JSON
-            data = json.loads(json_str)
+            data = orjson.loads(json_str)
             
             # 如果是列表，处理每个项目
             if isinstance(data, list):
                 processed_data = []
+                # 数据刚由JSON解析得到，不与调用方共享，可以就地修改
                 for item in data:
-                    processed_item = self._process_single_item(item)
+                    processed_item = self._process_single_item_inplace(item)
                     if processed_item:
                         processed_data.append(processed_item)
                 return processed_data if processed_data else None
             else:
                 # 处理单个项目
-                return self._process_single_item(data)
+                return self._process_single_item_inplace(data)
             
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             self.errors.append(f"JSON解析失败：{str(e)}")
             return None
         except Exception as e:
@@ -78,27 +248,30 @@ class JSONProcessor:
     
     def _process_single_item(self, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """处理单个JSON对象"""
+        # 复制数据以避免修改原始数据
+        return self._process_single_item_inplace(item.copy() if isinstance(item, dict) else item)
+    
+    def _process_single_item_inplace(self, processed_item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """就地处理单个JSON对象，仅用于刚解析出、不与调用方共享的数据"""
         try:
-            # 复制数据以避免修改原始数据
-            processed_item = item.copy()
-            
-            # 格式化选项（如果存在）
-            if "options" in processed_item:
-                processed_item["options"] = self._format_options(processed_item["options"])
-            
-            # 格式化答案
-            if "answer" in processed_item:
-                processed_item["answer"] = self._format_answer(processed_item["answer"])
-            
-            # 验证处理后的数据
-            if self._validate_json(processed_item):
-                return processed_item
-            return None
-            
+            processed_item, valid = self._normalize_and_validate(processed_item)
+            return processed_item if valid else None
         except Exception as e:
             self.errors.append(f"处理项目失败：{str(e)}")
             return None
     
+    def _normalize_and_validate(self, item: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        """就地格式化选项和答案并验证，一次完成，返回(数据, 是否有效)"""
+        if not isinstance(item, dict):
+            raise ValueError(f"数据项必须是对象，实际为{type(item).__name__}")
+        
+        if "options" in item:
+            item["options"] = self._format_options(item["options"])
+        if "answer" in item:
+            item["answer"] = self._format_answer(item["answer"])
+        
+        return item, self._do_validate(item, on_error=self._record_error)
+    
     def get_errors(self) -> List[str]:
         """获取错误信息列表"""
         return self.errors
@@ -108,16 +281,13 @@ class JSONProcessor:
         if not self.errors:
             return "没有错误"
         
-        return "\n".join([
-            f"错误 {i+1}: {error}"
-            for i, error in enumerate(self.errors)
-        ])
+        return "\n".join(f"错误 {i+1}: {error}" for i, error in enumerate(self.errors))
     
     def validate_schema(self) -> bool:
         """验证Schema本身是否有效"""
         try:
-            # 验证Schema是否符合JSON Schema规范
-            Draft7Validator.check_schema(self.schema)
+            # 验证Schema是否符合JSON Schema规范，同一Schema只检查一次
+            _check_schema(_schema_key(self.schema))
             return True
         except Exception as e:
             self.errors.append(f"Schema无效：{str(e)}")
@@ -140,48 +310,46 @@ class JSONProcessor:
         """转换选项格式"""
         if "options" in data and isinstance(data["options"], list):
             # 记录原始格式
-            self._log_error(
-                "format_conversion",
-                "检测到数组格式的选项，正在转换为对象格式",
-                {"original": data["options"]}
-            )
+            if self.debug:
+                self._log_error(
+                    "format_conversion",
+                    "检测到数组格式的选项，正在转换为对象格式",
+                    {"original": data["options"]}
+                )
             
             # 转换选项格式
-            options_dict = {}
-            for i, option in enumerate(data["options"]):
-                key = chr(65 + i)  # 65 是 'A' 的 ASCII 码
-                options_dict[key] = option
+            options_dict = dict(zip(_OPTION_KEYS, data["options"]))
             
             # 更新数据
             data["options"] = options_dict
             
             # 记录转换结果
-            self._log_error(
-                "format_conversion",
-                "选项格式转换完成",
-                {"converted": options_dict}
-            )
+            if self.debug:
+                self._log_error(
+                    "format_conversion",
+                    "选项格式转换完成",
+                    {"converted": options_dict}
+                )
         
         return data
 
     def _validate_schema(self, data: Any) -> bool:
         """验证数据是否符合Schema"""
-        try:
-            validate(instance=data, schema=self.schema)
-            return True
-        except ValidationError as e:
-            self._log_error(
-                "schema_validation",
-                str(e),
-                {
-                    "path": list(e.path),
-                    "schema_path": list(e.schema_path),
-                    "message": e.message,
-                    "validator": e.validator,
-                    "validator_value": e.validator_value
-                }
-            )
-            return False
+        return self._do_validate(data, on_error=self._log_validation_error)
+
+    def _log_validation_error(self, e: ValidationError) -> None:
+        """以结构化形式记录验证错误"""
+        self._log_error(
+            "schema_validation",
+            str(e),
+            {
+                "path": list(e.path),
+                "schema_path": list(e.schema_path),
+                "message": e.message,
+                "validator": e.validator,
+                "validator_value": e.validator_value
+            }
+        )
 
     def _format_error_message(self, error_info: Dict[str, Any]) -> str:
         """格式化错误信息"""
@@ -208,11 +376,7 @@ class JSONProcessor:
 
     def validate_json(self, data: Dict[str, Any], schema: Dict[str, Any]) -> bool:
         """验证JSON数据是否符合Schema"""
-        try:
-            validate(instance=data, schema=schema)
-            return True
-        except ValidationError as e:
-            raise ValueError(f"JSON验证失败: {str(e)}")
+        return self._do_validate(data, get_validator(schema), raise_on_error=True)
 
     def process_ai_response(self, response: Dict[str, Any], schema: Dict[str, Any]) -> List[Dict[str, Any]]:
         """处理AI返回的JSON数据"""
@@ -227,11 +391,9 @@ class JSONProcessor:
             elif not isinstance(response, list):
                 raise ValueError("AI返回的数据必须是对象或数组")
 
-            # 验证每个对象
-            validated_data = []
-            for item in response:
-                if self.validate_json(item, schema):
-                    validated_data.append(item)
+            # 验证每个对象，验证器只获取一次，不符合Schema的对象直接跳过
+            validator = get_validator(schema)
+            validated_data = [item for item in response if validator.is_valid(item)]
 
             if not validated_data:
                 raise ValueError("没有找到有效的试题数据")
@@ -242,7 +404,7 @@ class JSONProcessor:
 
     def format_json_for_display(self, data: List[Dict[str, Any]]) -> str:
         """格式化JSON数据用于显示"""
-        return json.dumps(data, ensure_ascii=False, indent=2)
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
 
     def prepare_excel_data(self, data: List[Dict[str, Any]], question_type: str) -> List[Dict[str, Any]]:
         """准备用于Excel导出的数据"""
@@ -254,9 +416,10 @@ class JSONProcessor:
 
             if question_type in ["single_choice", "multiple_choice"]:
                 # 添加选项
-                for option in ["A", "B", "C", "D", "E"]:
-                    if option in item["options"]:
-                        row[f"选项{option}"] = item["options"][option]
+                options = item["options"]
+                for option, column in _OPTION_COLUMNS.items():
+                    if option in options:
+                        row[column] = options[option]
 
                 # 添加答案
                 if question_type == "single_choice":
@@ -1,17 +1,18 @@
 import streamlit as st
 import json
+import orjson
 from schema_manager import SchemaManager
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import jsonschema
 
 class QuestionTypeManager:
-    def __init__(self):
+    def __init__(self, schema_manager: Optional[SchemaManager] = None):
         st.set_page_config(
             page_title="题型管理",
             page_icon="📝",
             layout="wide"
         )
-        self.schema_manager = SchemaManager()
+        self.schema_manager = schema_manager or SchemaManager()
         
         # 初始化会话状态
         if "selected_type" not in st.session_state:
@@ -21,30 +22,43 @@ class QuestionTypeManager:
         
     def render_schema_editor(self, schema_type: str = None):
         """渲染Schema编辑器"""
-        current_schema = (self.schema_manager.get_schema(schema_type) 
-                        if schema_type else {})
+        # 格式化后的Schema由SchemaManager缓存，Schema未修改时不再重复序列化
+        current_schema_json = (self.schema_manager.get_schema_pretty_json(schema_type)
+                               if schema_type else "{}")
         
         schema_str = st.text_area(
             "JSON Schema",
-            value=json.dumps(current_schema, ensure_ascii=False, indent=2),
+            value=current_schema_json,
             height=300,
             help="输入符合JSON Schema规范的定义",
             key=f"schema_editor_{schema_type}"
         )
         
-        try:
-            if schema_str:
+        if not schema_str:
+            return None
+        
+        # 文本未变化时直接使用上次的解析结果，不再重复解析和检查
+        cache_key = f"schema_editor_parsed_{schema_type}"
+        cached = st.session_state.get(cache_key)
+        if cached is None or cached[0] != schema_str:
+            schema, error = None, None
+            try:
                 schema = json.loads(schema_str)
                 # 验证Schema格式
                 jsonschema.Draft7Validator.check_schema(schema)
-                return schema
-        except json.JSONDecodeError:
-            st.error("JSON格式错误，请检查输入")
-        except jsonschema.exceptions.SchemaError as e:
-            st.error(f"Schema格式错误：{str(e)}")
-        except Exception as e:
-            st.error(f"发生错误：{str(e)}")
-        return None
+            except json.JSONDecodeError:
+                schema, error = None, "JSON格式错误，请检查输入"
+            except jsonschema.exceptions.SchemaError as e:
+                schema, error = None, f"Schema格式错误：{str(e)}"
+            except Exception as e:
+                schema, error = None, f"发生错误：{str(e)}"
+            cached = (schema_str, schema, error)
+            st.session_state[cache_key] = cached
+        
+        _, schema, error = cached
+        if error:
+            st.error(error)
+        return schema
 
     def render_prompt_editor(self, schema_type: str = None):
         """渲染提示词编辑器"""
@@ -65,18 +79,18 @@ class QuestionTypeManager:
         """渲染预览区域"""
         if schema and prompt_template:
             with st.expander("👀 预览配置", expanded=False):
-                st.json({
+                # 传入序列化好的字符串，st.json不再自行序列化
+                st.json(orjson.dumps({
                     "schema": schema,
                     "prompt_template": prompt_template
-                })
+                }).decode())
 
     def render_existing_types(self):
         """渲染现有题型列表"""
         st.sidebar.header("📚 现有题型")
         
         # 获取所有题型
-        schema_types = self.schema_manager.get_all_schema_types()
-        schema_names = {st: self.schema_manager.get_schema_name(st) for st in schema_types}
+        schema_names, _ = self.schema_manager.get_schema_names()
         
         # 创建选择器
         selected = st.sidebar.selectbox(
@@ -132,10 +146,10 @@ class QuestionTypeManager:
                     placeholder="输入题型描述"
                 )
             else:
-                st.subheader(f"✏️ 编辑题型：{self.schema_manager.get_schema_name(schema_type)}")
                 type_code = schema_type
                 type_name = self.schema_manager.get_schema_name(schema_type)
                 type_desc = self.schema_manager.get_schema_description(schema_type)
+                st.subheader(f"✏️ 编辑题型：{type_name}")
             
             # Schema编辑器
             st.subheader("📋 Schema定义")
@@ -156,7 +170,7 @@ class QuestionTypeManager:
             
             if st.form_submit_button(submit_label):
                 try:
-                    if is_new and not all([type_code, type_name, type_desc, schema, prompt_template]):
+                    if is_new and (not type_code or not type_name or not type_desc or not schema or not prompt_template):
                         st.error("请填写所有必要信息")
                         return
                     
@@ -170,9 +184,10 @@ class QuestionTypeManager:
                         )
                         msg = f"题型 {type_name} 创建成功！"
                     else:
-                        # 更新现有题型
-                        self.schema_manager.update_schema(type_code, schema)
-                        self.schema_manager.update_prompt(type_code, prompt_template)
+                        # 更新现有题型，Schema和提示词只保存一次
+                        with self.schema_manager.batch():
+                            self.schema_manager.update_schema(type_code, schema)
+                            self.schema_manager.update_prompt(type_code, prompt_template)
                         msg = f"题型 {type_name} 更新成功！"
                     
                     st.success(msg)
@@ -203,7 +218,7 @@ class QuestionTypeManager:
             
             # 显示Schema
             with st.expander("📋 Schema定义", expanded=True):
-                st.json(self.schema_manager.get_schema(schema_type))
+                st.json(self.schema_manager.get_schema_json(schema_type))
             
             # 显示提示词模板
             with st.expander("💭 提示词模板", expanded=True):
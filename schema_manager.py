@@ -1,58 +1,18 @@
-from typing import Dict, Any, Optional, List
+from typing import Callable, Dict, Any, Iterator, Optional, Tuple, TYPE_CHECKING
+import contextlib
 import json
 import os
+import tempfile
+import threading
+import orjson
 from jsonschema import Draft7Validator
 
-class SchemaManager:
-    def __init__(self):
-        self.schema_file = "schemas.json"
-        self.schemas = self._load_schemas()
-    
-    def _load_schemas(self) -> Dict[str, Dict[str, Any]]:
-        """加载所有Schema"""
-        if os.path.exists(self.schema_file):
-            with open(self.schema_file, "r", encoding="utf-8") as f:
-                return json.load(f)
-        return self._get_default_schemas()
-    
-    def _save_schemas(self) -> None:
-        """保存所有Schema"""
-        with open(self.schema_file, "w", encoding="utf-8") as f:
-            json.dump(self.schemas, f, ensure_ascii=False, indent=2)
-    
-    def _get_default_schemas(self) -> Dict[str, Dict[str, Any]]:
-        """获取默认的Schema定义"""
-        return {
-            "single_choice": {
-                "name": "单选题",
-                "description": "只有一个正确答案的选择题",
-                "schema": {
-                    "type": "object",
-                    "properties": {
-                        "question": {"type": "string", "description": "题目内容"},
-                        "options": {
-                            "type": "object",
-                            "description": "选项内容，键为选项编号（A、B、C、D等），值为选项内容",
-                            "patternProperties": {
-                                "^[A-E]$": {"type": "string"}
-                            },
-                            "minProperties": 2,
-                            "maxProperties": 5
-                        },
-                        "answer": {
-                            "type": "string",
-                            "description": "正确答案的选项编号",
-                            "pattern": "^[A-E]$"
-                        },
-                        "analysis": {
-                            "type": "string",
-                            "description": "解析说明（可选）"
-                        }
-                    },
-                    "required": ["question", "options", "answer"],
-                    "additionalProperties": False
-                },
-                "prompt_template": """请将以下单选题转换为JSON格式，要求：
+# JSON处理模块只在首次获取验证器时导入，避免拖慢主程序启动
+if TYPE_CHECKING:
+    from json_processor import SchemaValidator
+
+# 内置题型的提示词模板，模块级常量，所有实例共享同一个字符串对象
+_SINGLE_CHOICE_PROMPT = """请将以下单选题转换为JSON格式，要求：
 1. 题目内容放在question字段
 2. 选项内容放在options字段，格式为对象，键为选项编号（A、B、C、D等），值为选项内容
 3. 正确答案放在answer字段，只写选项编号
@@ -80,42 +40,8 @@ D. output()
 
 请按照上述格式转换以下试题：
 {text}"""
-            },
-            "multiple_choice": {
-                "name": "多选题",
-                "description": "有多个正确答案的选择题",
-                "schema": {
-                    "type": "object",
-                    "properties": {
-                        "question": {"type": "string", "description": "题目内容"},
-                        "options": {
-                            "type": "object",
-                            "description": "选项内容，键为选项编号（A、B、C、D等），值为选项内容",
-                            "patternProperties": {
-                                "^[A-E]$": {"type": "string"}
-                            },
-                            "minProperties": 2,
-                            "maxProperties": 5
-                        },
-                        "answer": {
-                            "type": "array",
-                            "description": "正确答案的选项编号列表",
-                            "items": {
-                                "type": "string",
-                                "pattern": "^[A-E]$"
-                            },
-                            "minItems": 1,
-                            "uniqueItems": True
-                        },
-                        "analysis": {
-                            "type": "string",
-                            "description": "解析说明（可选）"
-                        }
-                    },
-                    "required": ["question", "options", "answer"],
-                    "additionalProperties": False
-                },
-                "prompt_template": """请将以下多选题转换为JSON格式，要求：
+
+_MULTIPLE_CHOICE_PROMPT = """请将以下多选题转换为JSON格式，要求：
 1. 题目内容放在question字段
 2. 选项内容放在options字段，格式为对象，键为选项编号（A、B、C、D等），值为选项内容
 3. 正确答案放在answer字段，为选项编号的数组
@@ -143,27 +69,8 @@ D. boolean
 
 请按照上述格式转换以下试题：
 {text}"""
-            },
-            "true_false": {
-                "name": "判断题",
-                "description": "判断对错的题目",
-                "schema": {
-                    "type": "object",
-                    "properties": {
-                        "question": {"type": "string", "description": "题目内容"},
-                        "answer": {
-                            "type": "boolean",
-                            "description": "正确答案，true表示对，false表示错"
-                        },
-                        "analysis": {
-                            "type": "string",
-                            "description": "解析说明（可选）"
-                        }
-                    },
-                    "required": ["question", "answer"],
-                    "additionalProperties": False
-                },
-                "prompt_template": """请将以下判断题转换为JSON格式，要求：
+
+_TRUE_FALSE_PROMPT = """请将以下判断题转换为JSON格式，要求：
 1. 题目内容放在question字段
 2. 正确答案放在answer字段，true表示对，false表示错
 3. 如果有解析，放在analysis字段（可选）
@@ -180,135 +87,111 @@ Python是一门编译型语言。（对/错）
 
 请按照上述格式转换以下试题：
 {text}"""
-            }
-        }
-    
-    def get_schema(self, schema_type: str) -> Dict[str, Any]:
-        """获取指定类型的Schema"""
-        if schema_type not in self.schemas:
-            raise ValueError(f"未找到题型：{schema_type}")
-        return self.schemas[schema_type]["schema"]
-    
-    def get_prompt(self, schema_type: str) -> str:
-        """获取指定类型的提示词模板"""
-        if schema_type not in self.schemas:
-            raise ValueError(f"未找到题型：{schema_type}")
-        return self.schemas[schema_type]["prompt_template"]
-    
-    def get_schema_name(self, schema_type: str) -> str:
-        """获取Schema的显示名称"""
-        if schema_type not in self.schemas:
-            raise ValueError(f"未找到题型：{schema_type}")
-        return self.schemas[schema_type]["name"]
-    
-    def get_schema_description(self, schema_type: str) -> str:
-        """获取Schema的描述"""
-        if schema_type not in self.schemas:
-            raise ValueError(f"未找到题型：{schema_type}")
-        return self.schemas[schema_type]["description"]
-    
-    def get_all_schema_types(self) -> List[str]:
-        """获取所有可用的Schema类型"""
-        return list(self.schemas.keys())
-    
-    def add_custom_schema(self, name: str, description: str, schema: Dict[str, Any], prompt_template: str = None) -> None:
-        """添加自定义Schema"""
-        if not name or not schema:
-            raise ValueError("名称和Schema定义不能为空")
-        
-        # 验证Schema格式
-        if not isinstance(schema, dict):
-            raise ValueError("Schema必须是一个字典")
-        
-        # 验证Schema是否有效
-        try:
-            Draft7Validator.check_schema(schema)
-        except Exception as e:
-            raise ValueError(f"Schema格式无效：{str(e)}")
-        
-        # 如果没有提供提示词模板，使用默认模板
-        if not prompt_template:
-            prompt_template = f"""请将以下{description}转换为JSON格式，要求：
-1. 题目内容放在question字段
-2. 其他字段根据Schema定义提供
-3. 如果有解析，放在analysis字段（可选）
 
-请按照Schema定义转换以下试题：
-{{text}}"""
-        
-        # 添加到schemas中
-        self.schemas[name] = {
-            "name": description,  # 用description作为显示名称
-            "description": description,
-            "schema": schema,
-            "prompt_template": prompt_template
-        }
-        
-        # 保存到文件
-        self._save_schemas()
-    
-    def update_schema(self, schema_type: str, schema: Dict[str, Any]) -> None:
-        """更新现有的Schema"""
-        if schema_type not in self.schemas:
-            raise ValueError(f"未找到题型：{schema_type}")
-        
-        # 验证Schema格式
-        if not isinstance(schema, dict):
-            raise ValueError("Schema必须是一个字典")
-        
-        # 更新Schema
-        self.schemas[schema_type]["schema"] = schema
-        
-        # 保存到文件
-        self._save_schemas()
-    
-    def delete_schema(self, schema_type: str) -> None:
-        """删除指定的Schema"""
-        if schema_type not in self.schemas:
-            raise ValueError(f"未找到题型：{schema_type}")
-        
-        # 删除Schema
-        del self.schemas[schema_type]
-        
-        # 保存到文件
-        self._save_schemas()
 
-    def create_ai_prompt(self, text: str, question_type: str) -> str:
-        """创建发送给AI的提示词"""
-        template = self.get_prompt(question_type)
-        if not template:
-            raise ValueError(f"未找到题型 {question_type} 的提示词模板")
-        return template.format(text=text)
+def _build_single_choice() -> Dict[str, Any]:
+    """构建单选题的默认定义"""
+    return {
+        "name": "单选题",
+        "description": "只有一个正确答案的选择题",
+        "schema": {
+            "type": "object",
+            "properties": {
+                "question": {"type": "string", "description": "题目内容"},
+                "options": {
+                    "type": "object",
+                    "description": "选项内容，键为选项编号（A、B、C、D等），值为选项内容",
+                    "patternProperties": {
+                        "^[A-E]$": {"type": "string"}
+                    },
+                    "minProperties": 2,
+                    "maxProperties": 5
+                },
+                "answer": {
+                    "type": "string",
+                    "description": "正确答案的选项编号",
+                    "pattern": "^[A-E]$"
+                },
+                "analysis": {
+                    "type": "string",
+                    "description": "解析说明（可选）"
+                }
+            },
+            "required": ["question", "options", "answer"],
+            "additionalProperties": False
+        },
+        "prompt_template": _SINGLE_CHOICE_PROMPT
+    }
 
-    def load_custom_schema(self, schema_str: str) -> Dict[str, Any]:
-        """加载并验证自定义Schema"""
-        try:
-            schema = json.loads(schema_str)
-            # 基本验证
-            if not isinstance(schema, dict):
-                raise ValueError("Schema必须是JSON对象")
-            if "type" not in schema:
-                raise ValueError("Schema必须包含type字段")
-            if "properties" not in schema:
-                raise ValueError("Schema必须包含properties字段")
-            return schema
-        except json.JSONDecodeError:
-            raise ValueError("无效的JSON格式")
-        except Exception as e:
-            raise ValueError(f"Schema验证失败: {str(e)}")
 
-    def get_schema_types(self) -> list:
-        """获取所有内置的Schema类型"""
-        return list(self.schemas.keys())
+def _build_multiple_choice() -> Dict[str, Any]:
+    """构建多选题的默认定义"""
+    return {
+        "name": "多选题",
+        "description": "有多个正确答案的选择题",
+        "schema": {
+            "type": "object",
+            "properties": {
+                "question": {"type": "string", "description": "题目内容"},
+                "options": {
+                    "type": "object",
+                    "description": "选项内容，键为选项编号（A、B、C、D等），值为选项内容",
+                    "patternProperties": {
+                        "^[A-E]$": {"type": "string"}
+                    },
+                    "minProperties": 2,
+                    "maxProperties": 5
+                },
+                "answer": {
+                    "type": "array",
+                    "description": "正确答案的选项编号列表",
+                    "items": {
+                        "type": "string",
+                        "pattern": "^[A-E]$"
+                    },
+                    "minItems": 1,
+                    "uniqueItems": True
+                },
+                "analysis": {
+                    "type": "string",
+                    "description": "解析说明（可选）"
+                }
+            },
+            "required": ["question", "options", "answer"],
+            "additionalProperties": False
+        },
+        "prompt_template": _MULTIPLE_CHOICE_PROMPT
+    }
+
 
-    def create_ai_prompt(self, text: str, schema: Dict[str, Any]) -> str:
-        """创建发送给AI的提示词"""
-        schema_str = json.dumps(schema, ensure_ascii=False, indent=2)
-        
-        # 根据题型添加示例
-        example = ""
-        if schema == self.schemas["single_choice"]:
-            example = """
+def _build_true_false() -> Dict[str, Any]:
+    """构建判断题的默认定义"""
+    return {
+        "name": "判断题",
+        "description": "判断对错的题目",
+        "schema": {
+            "type": "object",
+            "properties": {
+                "question": {"type": "string", "description": "题目内容"},
+                "answer": {
+                    "type": "boolean",
+                    "description": "正确答案，true表示对，false表示错"
+                },
+                "analysis": {
+                    "type": "string",
+                    "description": "解析说明（可选）"
+                }
+            },
+            "required": ["question", "answer"],
+            "additionalProperties": False
+        },
+        "prompt_template": _TRUE_FALSE_PROMPT
+    }
+
+
+# 内置题型的提示词示例，按题型直接查找
+_EXAMPLES: Dict[str, str] = {
+    "single_choice": """
 示例输入：
 1. 以下哪个是中国的首都？
 A. 上海
@@ -348,9 +231,8 @@ D. 淮河
         "answer": "B",
         "analysis": "长江是中国第一大河，黄河是第二大河"
     }
-]"""
-        elif schema == self.schemas["multiple_choice"]:
-            example = """
+]""",
+    "multiple_choice": """
 示例输入：
 1. 以下哪些是中国的直辖市？（多选）
 A. 北京
@@ -392,9 +274,8 @@ E. 丝绸
         "answer": ["A", "B", "C", "D"],
         "analysis": "中国的四大发明是造纸术、指南针、火药和印刷术"
     }
-]"""
-        elif schema == self.schemas["true_false"]:
-            example = """
+]""",
+    "true_false": """
 示例输入：
 1. 北京是中国的首都。
 答案：是
@@ -414,12 +295,313 @@ E. 丝绸
         "answer": false,
         "analysis": "上海不是中国的首都，北京才是中国的首都"
     }
-]"""
+]""",
+}
+
 
-        return f"""请将以下试题文本转换为符合指定Schema的JSON格式。
+# 发送给AI的提示词开头，原始文本紧随其后
+_AI_PROMPT_HEAD = """请将以下试题文本转换为符合指定Schema的JSON格式。
 
 原始文本：
-{text}
+"""
+
+
+# 内置题型按需构建，每次返回新的字典，修改实例中的Schema不会影响默认定义
+_DEFAULT_FACTORIES: Dict[str, Callable[[], Dict[str, Any]]] = {
+    "single_choice": _build_single_choice,
+    "multiple_choice": _build_multiple_choice,
+    "true_false": _build_true_false,
+}
+
+
+class SchemaManager:
+    # 属性固定，用__slots__省去实例__dict__；新增属性时需同步加入
+    __slots__ = (
+        "schema_file",
+        "schemas",
+        "_schema_json",
+        "_schema_pretty_json",
+        "_schema_names",
+        "_schema_types",
+        "_validators",
+        "_ai_prompt_tails",
+        "_batch_depth",
+        "_dirty",
+        "_saved_content",
+        "_file_mtime",
+        "_lock",
+    )
+    
+    def __init__(self):
+        self.schema_file = "schemas.json"
+        self.schemas = self._load_schemas()
+        self._schema_json: Dict[str, str] = {}  # 序列化后的Schema缓存，Schema变更时失效
+        self._schema_pretty_json: Dict[str, str] = {}  # 带缩进的Schema缓存，供编辑器显示
+        self._schema_names: Optional[Tuple[Dict[str, str], Dict[str, str]]] = None  # 题型名称映射缓存，增删题型时失效
+        self._schema_types: Optional[Tuple[str, ...]] = None  # 题型列表缓存，增删题型时失效
+        self._validators: Dict[str, "SchemaValidator"] = {}  # 各题型已编译的验证器缓存，Schema变更时失效
+        self._ai_prompt_tails: Dict[str, str] = {}  # 各题型提示词中原始文本之后的部分，Schema变更时失效
+        self._batch_depth = 0  # 大于0时处于批量修改中，修改只做标记，退出时统一保存
+        self._dirty = False  # 批量修改中是否有未保存的修改
+        self._saved_content: Optional[bytes] = None  # 上次写入文件的内容
+        # 实例由所有会话共享，批量修改状态、保存和重新加载都在锁内进行；
+        # 批量修改期间一直持有锁，其他会话的保存会等到批量修改结束
+        self._lock = threading.RLock()
+    
+    def _get_file_mtime(self) -> Optional[int]:
+        """获取Schema文件的修改时间，文件不存在时返回None"""
+        try:
+            return os.stat(self.schema_file).st_mtime_ns
+        except OSError:
+            return None
+    
+    def _load_schemas(self) -> Dict[str, Dict[str, Any]]:
+        """加载所有Schema"""
+        # 先记录修改时间再读取，读取期间文件被修改时下次检查仍会重新加载
+        self._file_mtime = self._get_file_mtime()
+        if self._file_mtime is not None:
+            with open(self.schema_file, "rb") as f:
+                return orjson.loads(f.read())
+        return self._get_default_schemas()
+    
+    def _save_schemas(self) -> None:
+        """保存所有Schema"""
+        self._dirty = False
+        content = orjson.dumps(self.schemas, option=orjson.OPT_INDENT_2)
+        # 内容与上次保存的一致时不再写文件
+        if content == self._saved_content:
+            return
+        
+        # 先写同目录下名称唯一的临时文件并落盘再替换，避免写入中断时留下不完整的Schema文件，
+        # 主程序和题型管理页的实例同时保存时也不会互相覆盖临时文件
+        fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(self.schema_file) or ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.schema_file)
+        except BaseException:
+            os.unlink(tmp_file)
+            raise
+        self._saved_content = content
+        self._file_mtime = self._get_file_mtime()
+    
+    def reload_if_changed(self) -> bool:
+        """Schema文件被其他实例或进程修改时重新加载，返回是否重新加载"""
+        with self._lock:
+            mtime = self._get_file_mtime()
+            if mtime is None or mtime == self._file_mtime:
+                return False
+            self.schemas = self._load_schemas()
+            self._schema_json.clear()
+            self._schema_pretty_json.clear()
+            self._schema_names = None
+            self._schema_types = None
+            self._validators.clear()
+            self._ai_prompt_tails.clear()
+            self._saved_content = None
+            return True
+    
+    def _schemas_changed(self) -> None:
+        """Schema已修改：批量修改中只做标记，否则立即保存"""
+        with self._lock:
+            if self._batch_depth:
+                self._dirty = True
+            else:
+                self._save_schemas()
+    
+    @contextlib.contextmanager
+    def batch(self) -> Iterator["SchemaManager"]:
+        """批量修改Schema，期间的多次修改在退出时只保存一次"""
+        with self._lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if not self._batch_depth and self._dirty:
+                    self._save_schemas()
+    
+    def _get_default_schemas(self) -> Dict[str, Dict[str, Any]]:
+        """获取默认的Schema定义"""
+        return {schema_type: factory() for schema_type, factory in _DEFAULT_FACTORIES.items()}
+    
+    def _require(self, schema_type: str) -> Dict[str, Any]:
+        """获取指定类型的完整定义，不存在时抛出异常"""
+        entry = self.schemas.get(schema_type)
+        if entry is None:
+            raise ValueError(f"未找到题型：{schema_type}")
+        return entry
+    
+    def get_schema(self, schema_type: str) -> Dict[str, Any]:
+        """获取指定类型的Schema"""
+        return self._require(schema_type)["schema"]
+    
+    def get_schema_json(self, schema_type: str) -> str:
+        """获取指定类型Schema的JSON字符串"""
+        schema_json = self._schema_json.get(schema_type)
+        if schema_json is None:
+            schema_json = orjson.dumps(self.get_schema(schema_type)).decode()
+            self._schema_json[schema_type] = schema_json
+        return schema_json
+    
+    def get_schema_pretty_json(self, schema_type: str) -> str:
+        """获取指定类型Schema带缩进的JSON字符串"""
+        pretty_json = self._schema_pretty_json.get(schema_type)
+        if pretty_json is None:
+            pretty_json = orjson.dumps(self.get_schema(schema_type), option=orjson.OPT_INDENT_2).decode()
+            self._schema_pretty_json[schema_type] = pretty_json
+        return pretty_json
+    
+    def get_validator(self, schema_type: str) -> "SchemaValidator":
+        """获取指定类型Schema的验证器，首次使用时编译并缓存"""
+        validator = self._validators.get(schema_type)
+        if validator is None:
+            from json_processor import get_validator
+            validator = get_validator(self.get_schema(schema_type))
+            self._validators[schema_type] = validator
+        return validator
+    
+    def validate(self, schema_type: str, data: Any) -> bool:
+        """验证数据是否符合指定类型的Schema"""
+        return self.get_validator(schema_type).is_valid(data)
+    
+    def get_prompt(self, schema_type: str) -> str:
+        """获取指定类型的提示词模板"""
+        return self._require(schema_type)["prompt_template"]
+    
+    def get_schema_name(self, schema_type: str) -> str:
+        """获取Schema的显示名称"""
+        return self._require(schema_type)["name"]
+    
+    def get_schema_names(self) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """获取(题型→显示名称, 显示名称→题型)两个映射"""
+        if self._schema_names is None:
+            names = {schema_type: schema["name"] for schema_type, schema in self.schemas.items()}
+            self._schema_names = (names, {name: schema_type for schema_type, name in names.items()})
+        return self._schema_names
+    
+    def get_schema_description(self, schema_type: str) -> str:
+        """获取Schema的描述"""
+        return self._require(schema_type)["description"]
+    
+    def get_all_schema_types(self) -> Tuple[str, ...]:
+        """获取所有可用的Schema类型"""
+        if self._schema_types is None:
+            self._schema_types = tuple(self.schemas)
+        return self._schema_types
+    
+    def add_custom_schema(self, name: str, description: str, schema: Dict[str, Any], prompt_template: str = None) -> None:
+        """添加自定义Schema"""
+        if not name or not schema:
+            raise ValueError("名称和Schema定义不能为空")
+        
+        # 验证Schema格式
+        if not isinstance(schema, dict):
+            raise ValueError("Schema必须是一个字典")
+        
+        # 验证Schema是否有效
+        try:
+            Draft7Validator.check_schema(schema)
+        except Exception as e:
+            raise ValueError(f"Schema格式无效：{str(e)}")
+        
+        # 如果没有提供提示词模板，使用默认模板
+        if not prompt_template:
+            prompt_template = f"""请将以下{description}转换为JSON格式，要求：
+1. 题目内容放在question字段
+2. 其他字段根据Schema定义提供
+3. 如果有解析，放在analysis字段（可选）
+
+请按照Schema定义转换以下试题：
+{{text}}"""
+        
+        # 添加到schemas中
+        self.schemas[name] = {
+            "name": description,  # 用description作为显示名称
+            "description": description,
+            "schema": schema,
+            "prompt_template": prompt_template
+        }
+        self._schema_json.pop(name, None)
+        self._schema_pretty_json.pop(name, None)
+        self._validators.pop(name, None)
+        self._ai_prompt_tails.pop(name, None)
+        self._schema_names = None
+        self._schema_types = None
+        
+        # 保存到文件
+        self._schemas_changed()
+    
+    def update_schema(self, schema_type: str, schema: Dict[str, Any]) -> None:
+        """更新现有的Schema"""
+        entry = self._require(schema_type)
+        
+        # 验证Schema格式
+        if not isinstance(schema, dict):
+            raise ValueError("Schema必须是一个字典")
+        
+        # 更新Schema
+        entry["schema"] = schema
+        self._schema_json.pop(schema_type, None)
+        self._schema_pretty_json.pop(schema_type, None)
+        self._validators.pop(schema_type, None)
+        self._ai_prompt_tails.pop(schema_type, None)
+        
+        # 保存到文件
+        self._schemas_changed()
+    
+    def delete_schema(self, schema_type: str) -> None:
+        """删除指定的Schema"""
+        if schema_type not in self.schemas:
+            raise ValueError(f"未找到题型：{schema_type}")
+        
+        # 删除Schema
+        del self.schemas[schema_type]
+        self._schema_json.pop(schema_type, None)
+        self._schema_pretty_json.pop(schema_type, None)
+        self._validators.pop(schema_type, None)
+        self._ai_prompt_tails.pop(schema_type, None)
+        self._schema_names = None
+        self._schema_types = None
+        
+        # 保存到文件
+        self._schemas_changed()
+
+    def load_custom_schema(self, schema_str: str) -> Dict[str, Any]:
+        """加载并验证自定义Schema"""
+        try:
+            schema = json.loads(schema_str)
+            # 基本验证
+            if not isinstance(schema, dict):
+                raise ValueError("Schema必须是JSON对象")
+            if "type" not in schema:
+                raise ValueError("Schema必须包含type字段")
+            if "properties" not in schema:
+                raise ValueError("Schema必须包含properties字段")
+            return schema
+        except json.JSONDecodeError:
+            raise ValueError("无效的JSON格式")
+        except Exception as e:
+            raise ValueError(f"Schema验证失败: {str(e)}")
+
+    def create_ai_prompt(self, text: str, schema_type: str) -> str:
+        """创建发送给AI的提示词"""
+        # 原始文本之后的部分只与题型有关，按题型缓存，同一Schema只序列化和拼接一次
+        tail = self._ai_prompt_tails.get(schema_type)
+        if tail is None:
+            tail = self._render_ai_prompt_tail(schema_type)
+            self._ai_prompt_tails[schema_type] = tail
+        return _AI_PROMPT_HEAD + text + tail
+    
+    def _render_ai_prompt_tail(self, schema_type: str) -> str:
+        """生成提示词中原始文本之后的部分"""
+        # 与编辑器共用带缩进的Schema缓存，Schema未修改时不再重复序列化
+        schema_str = self.get_schema_pretty_json(schema_type)
+        example = _EXAMPLES.get(schema_type, "")
+
+        return f"""
 
 目标Schema：
 {schema_str}
@@ -445,24 +627,23 @@ E. 丝绸
         """加载自定义题型"""
         if os.path.exists("custom_schemas.json"):
             try:
-                with open("custom_schemas.json", "r", encoding="utf-8") as f:
-                    custom_schemas = json.load(f)
+                with open("custom_schemas.json", "rb") as f:
+                    custom_schemas = orjson.loads(f.read())
                     self.schemas.update(custom_schemas)
+                    self._schema_names = None
+                    self._schema_types = None
             except Exception as e:
                 print(f"加载自定义题型失败：{str(e)}")
 
     def _save_custom_schemas(self):
         """保存自定义题型"""
         try:
-            with open("custom_schemas.json", "w", encoding="utf-8") as f:
-                json.dump(self.schemas, f, ensure_ascii=False, indent=2)
+            with open("custom_schemas.json", "wb") as f:
+                f.write(orjson.dumps(self.schemas, option=orjson.OPT_INDENT_2))
         except Exception as e:
             print(f"保存自定义题型失败：{str(e)}") 
 
     def update_prompt(self, schema_type: str, prompt_template: str) -> None:
         """更新提示词模板"""
-        if schema_type not in self.schemas:
-            raise ValueError(f"未找到题型：{schema_type}")
-        
-        self.schemas[schema_type]["prompt_template"] = prompt_template
-        self._save_schemas() 
\ No newline at end of file
+        self._require(schema_type)["prompt_template"] = prompt_template
+        self._schemas_changed() 
\ No newline at end of file